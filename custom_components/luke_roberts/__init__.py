@@ -5,24 +5,30 @@ from __future__ import annotations
 from homeassistant.components import bluetooth
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import Platform
-from homeassistant.core import DOMAIN, HomeAssistant
+from homeassistant.core import HomeAssistant
 from homeassistant.exceptions import ConfigEntryNotReady
+from homeassistant.helpers.storage import Store
+
+from .connection import LukeRobertsConnection
+from .const import DOMAIN, STORAGE_VERSION
 
 PLATFORMS: list[Platform] = [Platform.LIGHT]
 
 
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Set up Luke Roberts Luvo BLE from a config entry."""
-    hass.data.setdefault(DOMAIN, {})[entry.entry_id] = entry.data
-
-    ble_device = bluetooth.async_ble_device_from_address(
-        hass, entry.unique_id.upper(), True
-    )
+    address = entry.unique_id.upper()
+    ble_device = bluetooth.async_ble_device_from_address(hass, address, True)
     if not ble_device:
         raise ConfigEntryNotReady(
-            f"Unable to find device with address {entry.unique_id}, ensure it's powered on"
+            f"Unable to find device with address {address}, ensure it's powered on"
         )
 
+    hass.data.setdefault(DOMAIN, {})[entry.entry_id] = {
+        "ble_device": ble_device,
+        "connection": LukeRobertsConnection(hass, ble_device),
+    }
+
     await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
 
     return True
@@ -31,6 +37,12 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Unload a config entry."""
     if unload_ok := await hass.config_entries.async_unload_platforms(entry, PLATFORMS):
-        hass.data[DOMAIN].pop(entry.entry_id)
+        data = hass.data[DOMAIN].pop(entry.entry_id)
+        await data["connection"].async_disconnect()
 
     return unload_ok
+
+
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Remove the stored effect list of a deleted config entry."""
+    await Store(hass, STORAGE_VERSION, f"{DOMAIN}.{entry.entry_id}").async_remove()
@@ -0,0 +1,254 @@
+"""BLE session shared by the Luke Roberts Luvo BLE platforms."""
+
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Callable
+import contextlib
+import logging
+import time
+from typing import TYPE_CHECKING
+
+from bleak import BleakClient
+from bleak.exc import BleakError
+import bleak_retry_connector
+
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.exceptions import HomeAssistantError
+
+from .const import API_UUID, SCENE_UUID
+
+if TYPE_CHECKING:
+    from bleak import BleakGATTCharacteristic
+    from bleak.backends.device import BLEDevice
+
+_LOGGER = logging.getLogger(__name__)
+
+# Keep the BLE session open this long after the last command before dropping it
+IDLE_DISCONNECT_SECONDS = 30
+RESPONSE_TIMEOUT_SECONDS = 5.0
+
+
+class LukeRobertsConnection:
+    """Single BLE session to a lamp, shared by every entity of a config entry."""
+
+    __slots__ = (
+        "_ble_device",
+        "_can_write_without_response",
+        "_client",
+        "_disconnect_handle",
+        "_hass",
+        "_io_lock",
+        "_last_use",
+        "_pending_response",
+        "_scene_listeners",
+        "_write_without_response",
+    )
+
+    def __init__(self, hass: HomeAssistant, ble_device: BLEDevice) -> None:
+        """Initialize the connection."""
+        self._hass = hass
+        self._ble_device = ble_device
+        self._client: BleakClient | None = None
+        # Serializes connecting and GATT operations on the session
+        self._io_lock = asyncio.Lock()
+        self._last_use: float = 0.0
+        self._disconnect_handle: asyncio.TimerHandle | None = None
+        # Request waiting for its reply notification, if any
+        self._pending_response: asyncio.Future[bytes] | None = None
+        self._scene_listeners: list[Callable[[int], None]] = []
+        # The reply notification already acknowledges a command, so the GATT
+        # write response is skipped once the session has proven itself
+        self._can_write_without_response = False
+        self._write_without_response = False
+
+    @property
+    def address(self) -> str:
+        """Return the Bluetooth address of the lamp."""
+        return self._ble_device.address
+
+    async def async_send(self, data: bytes) -> bytes:
+        """Write a command to the API characteristic and return the reply."""
+        # Every reply arrives on the same notification and carries nothing that
+        # ties it to its command, so the lock is held until the reply is in
+        async with self._io_lock:
+            client = await self._async_get_client()
+            response: asyncio.Future[bytes] = self._hass.loop.create_future()
+            self._pending_response = response
+            try:
+                await client.write_gatt_char(
+                    API_UUID, data=data, response=not self._write_without_response
+                )
+                reply = await asyncio.wait_for(
+                    response, timeout=RESPONSE_TIMEOUT_SECONDS
+                )
+            except TimeoutError:
+                # A late reply would be taken for the next request's; start a
+                # fresh session instead
+                if self._client is client:
+                    await self._async_drop_session()
+                raise HomeAssistantError(
+                    f"Timed out waiting for a response from {self.address}"
+                ) from None
+            except BleakError:
+                if self._client is client:
+                    await self._async_drop_session()
+                raise
+            finally:
+                self._pending_response = None
+                if not response.done():
+                    response.cancel()
+                elif not response.cancelled():
+                    # The disconnect callback may have failed it while the
+                    # write was still running; mark that failure as retrieved
+                    response.exception()
+            if self._client is client:
+                self._write_without_response = self._can_write_without_response
+            return reply
+
+    async def async_read(self, uuid: str) -> bytes:
+        """Read a characteristic."""
+        async with self._io_lock:
+            client = await self._async_get_client()
+            try:
+                return bytes(await client.read_gatt_char(uuid))
+            except BleakError:
+                await self._async_drop_session()
+                raise
+
+    @callback
+    def async_add_scene_listener(
+        self, listener: Callable[[int], None]
+    ) -> CALLBACK_TYPE:
+        """Call listener with the scene id whenever the lamp reports a change."""
+        self._scene_listeners.append(listener)
+
+        @callback
+        def _remove() -> None:
+            self._scene_listeners.remove(listener)
+
+        return _remove
+
+    async def async_disconnect(self) -> None:
+        """Close the session and stop the idle timer."""
+        if self._disconnect_handle:
+            self._disconnect_handle.cancel()
+            self._disconnect_handle = None
+        async with self._io_lock:
+            await self._async_drop_session()
+
+    async def _async_get_client(self) -> BleakClient:
+        """Return a connected client, reusing the open session if there is one.
+
+        Must be called with the I/O lock held.
+        """
+        if self._client is None or not self._client.is_connected:
+            client = await bleak_retry_connector.establish_connection(
+                BleakClient,
+                self._ble_device,
+                self.address,
+                disconnected_callback=self._on_disconnect,
+            )
+            try:
+                await self._async_setup_session(client)
+            except BaseException:
+                # Nothing else owns this client yet, so release its link here
+                with contextlib.suppress(BleakError):
+                    await client.disconnect()
+                raise
+            self._client = client
+        self._last_use = time.monotonic()
+        if self._disconnect_handle is None:
+            self._disconnect_handle = self._hass.loop.call_later(
+                IDLE_DISCONNECT_SECONDS, self._maybe_disconnect
+            )
+        return self._client
+
+    async def _async_setup_session(self, client: BleakClient) -> None:
+        """Prepare a freshly connected client for use."""
+        await self._async_acquire_mtu(client)
+        api_char = client.services.get_characteristic(API_UUID)
+        self._can_write_without_response = (
+            api_char is not None and "write-without-response" in api_char.properties
+        )
+        # Confirm the first write of every session so failures surface early
+        self._write_without_response = False
+        # Responses arrive as notifications; subscribe once per session
+        await client.start_notify(API_UUID, self._on_notify)
+        scene_char = client.services.get_characteristic(SCENE_UUID)
+        if scene_char is not None and "notify" in scene_char.properties:
+            # Picks up scene changes made with the remote or the app
+            await client.start_notify(SCENE_UUID, self._on_scene_notify)
+
+    async def _async_acquire_mtu(self, client: BleakClient) -> None:
+        """Negotiate the ATT MTU so scene names fit in a single notification."""
+        # BlueZ reports the default MTU until it has been explicitly acquired;
+        # other backends exchange it while connecting
+        if client._backend.__class__.__name__ == "BleakClientBlueZDBus":
+            try:
+                await client._backend._acquire_mtu()
+            except BleakError as err:
+                _LOGGER.debug("Unable to acquire MTU for %s: %s", self.address, err)
+        _LOGGER.debug("Connected to %s with MTU %d", self.address, client.mtu_size)
+
+    def _maybe_disconnect(self) -> None:
+        """Disconnect once the session has been idle long enough."""
+        self._disconnect_handle = None
+        idle = time.monotonic() - self._last_use
+        if idle < IDLE_DISCONNECT_SECONDS:
+            self._disconnect_handle = self._hass.loop.call_later(
+                IDLE_DISCONNECT_SECONDS - idle, self._maybe_disconnect
+            )
+            return
+        self._hass.async_create_task(self._async_idle_disconnect(), eager_start=True)
+
+    async def _async_idle_disconnect(self) -> None:
+        async with self._io_lock:
+            # A command may have used the session while this waited for the lock
+            idle = time.monotonic() - self._last_use
+            if idle < IDLE_DISCONNECT_SECONDS:
+                if self._disconnect_handle is None:
+                    self._disconnect_handle = self._hass.loop.call_later(
+                        IDLE_DISCONNECT_SECONDS - idle, self._maybe_disconnect
+                    )
+                return
+            if self._client is not None:
+                _LOGGER.debug("Disconnecting idle session to %s", self.address)
+                await self._async_drop_session()
+
+    async def _async_drop_session(self) -> None:
+        """Close the session so the next call reconnects cleanly.
+
+        Must be called with the I/O lock held.
+        """
+        client, self._client = self._client, None
+        self._fail_pending_response()
+        if client is not None:
+            with contextlib.suppress(BleakError):
+                await client.disconnect()
+
+    def _on_disconnect(self, client: BleakClient) -> None:
+        if client is not self._client:
+            return
+        _LOGGER.debug("Lost connection to %s", self.address)
+        self._client = None
+        self._fail_pending_response()
+
+    def _fail_pending_response(self) -> None:
+        # A reply owed by a closed session will never arrive
+        response, self._pending_response = self._pending_response, None
+        if response is not None and not response.done():
+            response.set_exception(BleakError(f"Lost connection to {self.address}"))
+
+    def _on_notify(self, _: BleakGATTCharacteristic, data: bytearray) -> None:
+        response = self._pending_response
+        if response is None or response.done():
+            _LOGGER.debug("Dropping unsolicited response %s", data.hex())
+            return
+        response.set_result(bytes(data))
+
+    def _on_scene_notify(self, _: BleakGATTCharacteristic, data: bytearray) -> None:
+        if not data:
+            return
+        for listener in self._scene_listeners:
+            listener(data[0])
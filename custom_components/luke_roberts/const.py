@@ -4,3 +4,6 @@ DOMAIN = "luke_roberts"
 SERVICE_UUID = "44092840-0567-11E6-B862-0002A5D5C51B"
 API_UUID = "44092842-0567-11E6-B862-0002A5D5C51B"
 SCENE_UUID = "44092844-0567-11E6-B862-0002A5D5C51B"
+
+# Version of the stored effect list
+STORAGE_VERSION = 1
@@ -3,31 +3,53 @@
 from __future__ import annotations
 
 import asyncio
+from datetime import datetime, timedelta
 import logging
-from typing import Any
+import struct
+import time
+from typing import TYPE_CHECKING, Any
 
-from bleak import BleakClient, BleakGATTCharacteristic
-from bleak.backends.device import BLEDevice
-import bleak_retry_connector
+from bleak.exc import BleakError
 
 from homeassistant import config_entries
-from homeassistant.components import bluetooth
 from homeassistant.components.light import (
     ATTR_EFFECT,
     LightEntity,
     LightEntityFeature,
     ColorMode,
 )
-from homeassistant.core import HomeAssistant
-from homeassistant.exceptions import ConfigEntryNotReady
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.exceptions import HomeAssistantError
 from homeassistant.helpers import device_registry as dr
 from homeassistant.helpers.device_registry import DeviceInfo
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
+from homeassistant.helpers.event import async_track_time_interval
+from homeassistant.helpers.storage import Store
 
-from .const import API_UUID, DOMAIN, SCENE_UUID
+from .connection import LukeRobertsConnection
+from .const import DOMAIN, SCENE_UUID, STORAGE_VERSION
+
+if TYPE_CHECKING:
+    from bleak.backends.device import BLEDevice
 
 _LOGGER = logging.getLogger(__name__)
 
+# Bursts of turn_on/turn_off calls within this window collapse into one write
+COMMAND_DEBOUNCE_SECONDS = 0.08
+# Catches scene changes made while no session was open to push them
+REFRESH_INTERVAL = timedelta(minutes=10)
+# Scenes renamed in the app keep their id, so only a periodic re-read finds them
+EFFECT_LIST_REFRESH_INTERVAL = timedelta(hours=24)
+# An unknown scene id that a fresh read did not turn up is not looked for again
+# before this many seconds have passed
+EFFECT_LIST_RETRY_SECONDS = 300
+
+# Scene commands: a fixed 3-byte header (0xA0 marker, API version, opcode)
+# followed by the scene id
+_CMD_SCENE = struct.Struct(">3sB")
+_SCENE_QUERY_PREFIX = b"\xa0\x01\x01"
+_SCENE_SELECT_PREFIX = b"\xa0\x02\x05"
+
 
 async def async_setup_entry(
     hass: HomeAssistant,
@@ -35,14 +57,14 @@ async def async_setup_entry(
     async_add_entities: AddEntitiesCallback,
 ) -> None:
     """Set up the Luke Roberts Luvo BLE Light."""
-    ble_device = bluetooth.async_ble_device_from_address(
-        hass, entry.unique_id.upper(), True
+    data = hass.data[DOMAIN][entry.entry_id]
+    store: Store[dict[str, Any]] = Store(
+        hass, STORAGE_VERSION, f"{DOMAIN}.{entry.entry_id}"
+    )
+    async_add_entities(
+        [LukeRobertsLuvoBleLight(data["ble_device"], data["connection"], store)],
+        update_before_add=True,
     )
-    if not ble_device:
-        raise ConfigEntryNotReady(
-            f"Unable to find device with address {entry.unique_id}, ensure it's powered on"
-        )
-    async_add_entities([LukeRobertsLuvoBleLight(ble_device)], update_before_add=True)
 
 
 class LukeRobertsLuvoBleLight(LightEntity):
@@ -51,19 +73,32 @@ class LukeRobertsLuvoBleLight(LightEntity):
     EFFECT_ID_DEFAULT = 255
     EFFECT_ID_OFF = 0
 
+    # State is read once when added and then kept current locally
+    _attr_should_poll = False
     _attr_supported_features = LightEntityFeature(LightEntityFeature.EFFECT)
     _attr_color_mode = ColorMode.ONOFF
     _attr_supported_color_modes = {ColorMode.ONOFF}
 
-    def __init__(self, ble_device: BLEDevice) -> None:
+    def __init__(
+        self,
+        ble_device: BLEDevice,
+        connection: LukeRobertsConnection,
+        store: Store[dict[str, Any]],
+    ) -> None:
         """Initialize an LukeRobertsLuvoBleLight."""
-        self._state = None
-        self._ble_device = ble_device
-        self._device: BleakClient | None = None
+        self._conn = connection
+        self._store = store
+        self._pending_effect: int | None = None
+        self._flush_handle: asyncio.TimerHandle | None = None
         self._attr_unique_id = ble_device.address
 
         self._effect_map: dict[str, int] = {}
+        self._effect_name_by_id: dict[int, str] = {}
+        self._effect_list_task: asyncio.Task[None] | None = None
+        self._effect_list_read_at = 0.0
+        self._searched_scene_ids: set[int] = set()
         self._effect = None
+        self._scene_id: int | None = None
 
         self._attr_device_info = DeviceInfo(
             identifiers={(DOMAIN, self.unique_id)},
@@ -82,105 +117,222 @@ class LukeRobertsLuvoBleLight(LightEntity):
         """Return the current effect."""
         return self._effect
 
-    @property
-    def is_on(self) -> bool | None:
-        """Return true if light is on."""
-        _LOGGER.info(
-            "Current effect %s %s", self._effect, self._effect_map.get(self._effect)
-        )
-        return self._effect_map.get(self._effect) != 0
-
     async def async_turn_on(self, **kwargs: Any) -> None:
         """Instruct the light to turn on."""
+        new_effect = kwargs.get(ATTR_EFFECT)
+        if new_effect is None:
+            effect_id = self.EFFECT_ID_DEFAULT
+        elif (effect_id := self._effect_map.get(new_effect)) is None:
+            return
 
-        if ATTR_EFFECT in kwargs:
-            effect_name = kwargs.get(ATTR_EFFECT)
-            effect_id = self._effect_map.get(effect_name)
-            if effect_id is None:
-                return
-
-            if await self._set_effect(effect_id):
-                self._effect = effect_name
-        else:
-            await self._set_effect(self.EFFECT_ID_DEFAULT)
-
+        # The scene is the only state the lamp takes, so one write covers the call
+        self._queue_effect(effect_id)
 
     async def async_turn_off(self, **kwargs: Any) -> None:
         """Instruct the light to turn off."""
-
-        if await self._set_effect(self.EFFECT_ID_OFF):
-            self._effect = self._get_effect_name_by_id(self.EFFECT_ID_OFF)
+        self._queue_effect(self.EFFECT_ID_OFF)
 
     async def async_update(self) -> None:
         """Fetch new state data for this light.
 
         This is the only method that should fetch new data for Home Assistant.
         """
-        _LOGGER.info("FETCHING DATA")
-        self._device = await bleak_retry_connector.establish_connection(
-            BleakClient, self._ble_device, self.unique_id
-        )
-        _LOGGER.info("GOT CONNECTION")
+        _LOGGER.debug("FETCHING DATA")
         if not self._effect_map:
-            await self._update_effect_list()
+            await self._load_effect_list()
         await self._update_effect()
-        _LOGGER.info("DONE FETCHING DATA")
+        _LOGGER.debug("DONE FETCHING DATA")
 
-    async def _update_effect_list(self) -> None:
-        effect_map = {}
+    async def async_added_to_hass(self) -> None:
+        """Follow scene changes reported by the lamp."""
+        self.async_on_remove(
+            self._conn.async_add_scene_listener(self._handle_scene_change)
+        )
+        self.async_on_remove(
+            async_track_time_interval(self.hass, self._async_refresh, REFRESH_INTERVAL)
+        )
+        self.async_on_remove(
+            async_track_time_interval(
+                self.hass,
+                self._async_effect_list_interval,
+                EFFECT_LIST_REFRESH_INTERVAL,
+            )
+        )
+
+    async def async_will_remove_from_hass(self) -> None:
+        """Drop any scene change that has not been sent yet."""
+        if self._flush_handle:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        if self._effect_list_task:
+            self._effect_list_task.cancel()
+            self._effect_list_task = None
+
+    async def _async_refresh(self, _: datetime) -> None:
+        """Re-read the current scene from the lamp."""
+        try:
+            await self.async_update()
+        except (BleakError, HomeAssistantError, TimeoutError) as err:
+            _LOGGER.debug("Unable to refresh %s: %s", self.entity_id, err)
+            return
+        self.async_write_ha_state()
+
+    def _queue_effect(self, effect_id: int) -> None:
+        """Schedule a scene change, replacing any change not yet sent."""
+        self._pending_effect = effect_id
+        if self._flush_handle:
+            self._flush_handle.cancel()
+        self._flush_handle = self.hass.loop.call_later(
+            COMMAND_DEBOUNCE_SECONDS,
+            lambda: self.hass.async_create_task(self._flush(), eager_start=True),
+        )
+
+    async def _flush(self) -> None:
+        """Send the most recently requested scene."""
+        self._flush_handle = None
+        if self._pending_effect is None:
+            return
+        effect_id = self._pending_effect
+        self._pending_effect = None
+        # Nobody awaits this task, so failures have to be reported here
+        try:
+            if not await self._set_effect(effect_id):
+                _LOGGER.warning("Lamp rejected scene %d", effect_id)
+                return
+            if effect_id == self.EFFECT_ID_DEFAULT:
+                # The lamp picks the default scene itself, ask it which one
+                await self._update_effect()
+            else:
+                self._apply_scene_id(effect_id)
+        except (BleakError, HomeAssistantError, TimeoutError) as err:
+            _LOGGER.warning(
+                "Unable to set scene %d on %s: %s", effect_id, self.entity_id, err
+            )
+            return
+        self.async_write_ha_state()
+
+    async def _load_effect_list(self) -> None:
+        """Use the stored effect list, reading it from the lamp if there is none."""
+        if (stored := await self._store.async_load()) is None:
+            await self._update_effect_list()
+            return
+        self._effect_map = stored["effects"]
+        self._effect_name_by_id = {v: k for k, v in self._effect_map.items()}
+
+    @callback
+    def _async_effect_list_interval(self, _: datetime) -> None:
+        self._schedule_effect_list_refresh()
+
+    @callback
+    def _schedule_effect_list_refresh(self) -> None:
+        """Re-read the effect list in the background unless that is under way."""
+        if self._effect_list_task is not None and not self._effect_list_task.done():
+            return
+        self._effect_list_task = self.hass.async_create_background_task(
+            self._async_refresh_effect_list(), f"{DOMAIN} effect list {self.unique_id}"
+        )
+
+    async def _async_refresh_effect_list(self) -> None:
+        try:
+            changed = await self._update_effect_list()
+        except (BleakError, HomeAssistantError, TimeoutError) as err:
+            _LOGGER.debug("Unable to refresh effects of %s: %s", self.entity_id, err)
+            return
+        if not changed:
+            return
+        if self._scene_id is not None:
+            # The current scene may have a new name
+            self._apply_scene_id(self._scene_id)
+        self.async_write_ha_state()
+
+    async def _update_effect_list(self) -> bool:
+        """Read the effect list from the lamp and return whether it changed."""
+        # Only a walk that reached the end of the chain is worth storing
+        complete = True
+        self._effect_list_read_at = time.monotonic()
+        effect_map: dict[str, int] = {}
+        id_map: dict[int, str] = {}
         scene_id = 0
-        scene_data = await self._get_scene(scene_id)
-        while True:
+        # Scene ids are a single byte, so the chain can't be longer than this
+        for _ in range(0xFF):
+            scene_data = await self._get_scene(scene_id)
             if scene_data[0] != 0x00:
                 _LOGGER.warning("Failed to retrieve scene data for %d", scene_id)
+                complete = False
                 break
 
-            effect_map[scene_data[3:].decode()] = scene_id
+            # Decode the name in place instead of copying it out first
+            name = str(memoryview(scene_data)[3:], "utf-8")
+            effect_map[name] = scene_id
+            id_map[scene_id] = name
 
             scene_id = scene_data[2]
             if scene_id == 0xFF:
                 # No more scenes, we're done
                 break
-            scene_data = await self._get_scene(scene_id)
+        else:
+            _LOGGER.warning("Scene chain of %s does not end", self.entity_id)
+            complete = False
+        if not complete and self._effect_map:
+            # Keep the list we have over a partial one
+            return False
+        changed = list(effect_map.items()) != list(self._effect_map.items())
         self._effect_map = effect_map
-
-    async def _get_scene(self, id: int) -> bytearray:
-        _LOGGER.info("Getting scene %d", id)
-        return await self._send_and_await_response(data=b"\xa0\x01\x01" + bytes([id]))
-
-    async def _send_and_await_response(self, data: bytearray) -> bytearray:
-        data_received_flag = asyncio.Event()
-        received_data = bytearray()
-
-        def handle_notification(_: BleakGATTCharacteristic, data: bytearray):
-            nonlocal received_data
-            received_data = data
-            data_received_flag.set()
-
-        await self._device.start_notify(API_UUID, handle_notification)
-        await self._device.write_gatt_char(API_UUID, data=data, response=True)
-        await data_received_flag.wait()
-        await self._device.stop_notify(API_UUID)
-        return received_data
+        self._effect_name_by_id = id_map
+        if effect_map and complete and changed:
+            await self._store.async_save({"effects": effect_map})
+        return changed
+
+    async def _get_scene(self, id: int) -> bytes:
+        _LOGGER.debug("Getting scene %d", id)
+        return await self._conn.async_send(
+            data=_CMD_SCENE.pack(_SCENE_QUERY_PREFIX, id)
+        )
 
     async def _update_effect(self) -> None:
-        current_scene_id_byte_array = await self._device.read_gatt_char(SCENE_UUID)
-        current_scene_id = int.from_bytes(current_scene_id_byte_array)
-        _LOGGER.info("Current scene id %s", current_scene_id)
-        self._effect = self._get_effect_name_by_id(current_scene_id)
-        _LOGGER.info("Current scene name %s", self._effect)
+        current_scene_id_byte_array = await self._conn.async_read(SCENE_UUID)
+        if not current_scene_id_byte_array:
+            return
+        # The scene id is a single byte
+        current_scene_id = current_scene_id_byte_array[0]
+        if self._is_new_scene(current_scene_id):
+            await self._update_effect_list()
+        self._apply_scene_id(current_scene_id)
+
+    @callback
+    def _handle_scene_change(self, scene_id: int) -> None:
+        self._apply_scene_id(scene_id)
+        self.async_write_ha_state()
+        if self._is_new_scene(scene_id):
+            self._schedule_effect_list_refresh()
+
+    def _is_new_scene(self, scene_id: int) -> bool:
+        """Return whether scene_id calls for re-reading the effect list."""
+        if scene_id in self._effect_name_by_id:
+            return False
+        # A scene added in the app since the list was read; an id the last read
+        # already looked for is only searched again once the retry delay passed
+        if (
+            scene_id in self._searched_scene_ids
+            and time.monotonic() - self._effect_list_read_at
+            < EFFECT_LIST_RETRY_SECONDS
+        ):
+            return False
+        self._searched_scene_ids.add(scene_id)
+        return True
+
+    def _apply_scene_id(self, scene_id: int) -> None:
+        _LOGGER.debug("Current scene id %s", scene_id)
+        self._scene_id = scene_id
+        self._effect = self._get_effect_name_by_id(scene_id)
+        self._attr_is_on = scene_id != self.EFFECT_ID_OFF
+        _LOGGER.debug("Current scene name %s", self._effect)
 
     async def _set_effect(self, effect_id: int) -> bool:
-        self._device = await bleak_retry_connector.establish_connection(
-            BleakClient, self._ble_device, self.unique_id
-        )
-        response = await self._send_and_await_response(
-            data=b"\xa0\x02\x05" + bytes([effect_id])
+        response = await self._conn.async_send(
+            data=_CMD_SCENE.pack(_SCENE_SELECT_PREFIX, effect_id)
         )
-        return response == 0x00
+        return bool(response) and response[0] == 0x00
 
     def _get_effect_name_by_id(self, effect_id: int) -> str | None:
-        for name, id in self._effect_map.items():
-            if id == effect_id:
-                return name
-        return None
+        return self._effect_name_by_id.get(effect_id)